@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import deque
+
+from config import (
+    GOVERNOR_INCREASE_STEP, GOVERNOR_INITIAL_RATE, GOVERNOR_MAX_RATE,
+    GOVERNOR_MIN_RATE, GOVERNOR_TARGET_P95, GOVERNOR_WINDOW
+)
+
+
+class TokenBucket:
+    """Token bucket de un destino con su historial de latencias"""
+
+    def __init__(self, rate, window):
+        self.rate = rate
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.latencies = deque(maxlen=window)
+
+    def refill(self, now):
+        # Capacidad de ráfaga de un segundo de tasa (mínimo un token)
+        capacity = max(1.0, self.rate)
+        self.tokens = min(capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def p95(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+class RateGovernor:
+    """Limita la tasa de envío de códigos por destino y la adapta a la latencia observada.
+
+    Aumenta la tasa de forma aditiva mientras el p95 de latencia se mantiene
+    bajo el objetivo y la reduce a la mitad cuando lo supera. Un timeout o
+    fallo la reduce a la mitad de inmediato, sin esperar a que afecte al p95.
+    """
+
+    MIN_SAMPLES = 5
+
+    def __init__(self, min_rate=GOVERNOR_MIN_RATE, max_rate=GOVERNOR_MAX_RATE,
+                 initial_rate=GOVERNOR_INITIAL_RATE, increase_step=GOVERNOR_INCREASE_STEP,
+                 target_p95=GOVERNOR_TARGET_P95, window=GOVERNOR_WINDOW):
+        if min_rate <= 0:
+            raise ValueError("min_rate debe ser mayor que 0")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.initial_rate = initial_rate
+        self.increase_step = increase_step
+        self.target_p95 = target_p95
+        self.window = window
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, target):
+        bucket = self.buckets.get(target)
+        if bucket is None:
+            rate = min(self.max_rate, max(self.min_rate, self.initial_rate))
+            bucket = self.buckets[target] = TokenBucket(rate, self.window)
+        return bucket
+
+    def set_limits(self, min_rate, max_rate):
+        """Actualiza los límites de tasa y ajusta las tasas actuales a ellos"""
+        if min_rate <= 0:
+            raise ValueError("min_rate debe ser mayor que 0")
+        with self.lock:
+            self.min_rate = min_rate
+            self.max_rate = max(min_rate, max_rate)
+            for bucket in self.buckets.values():
+                bucket.rate = min(self.max_rate, max(self.min_rate, bucket.rate))
+
+    def acquire(self, target):
+        """Bloquea hasta que el destino tenga un token disponible"""
+        while True:
+            with self.lock:
+                bucket = self._bucket(target)
+                bucket.refill(time.monotonic())
+                if bucket.tokens >= 1.0:
+                    bucket.tokens -= 1.0
+                    return
+                wait = (1.0 - bucket.tokens) / bucket.rate
+            time.sleep(wait)
+
+    def record(self, target, latency, failed=False):
+        """Registra una latencia (en segundos) y ajusta la tasa del destino"""
+        with self.lock:
+            bucket = self._bucket(target)
+            bucket.refill(time.monotonic())
+            if failed:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                bucket.latencies.clear()
+                bucket.latencies.append(latency)
+                return
+            bucket.latencies.append(latency)
+            if len(bucket.latencies) < self.MIN_SAMPLES:
+                return
+            if bucket.p95() > self.target_p95:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                # Empezar una ventana nueva para no volver a penalizar las mismas muestras
+                bucket.latencies.clear()
+            else:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+
+    def snapshot(self, target):
+        """Devuelve (tasa actual, p95 de latencia) de un destino"""
+        with self.lock:
+            bucket = self._bucket(target)
+            return bucket.rate, bucket.p95()
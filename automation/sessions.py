@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+import re
+import socket
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+# Archivos que Chrome crea en el perfil mientras lo tiene abierto
+PROFILE_LOCK_FILES = ("SingletonLock", "lockfile")
+DEVTOOLS_PORT_FILE = "DevToolsActivePort"
+
+
+def read_devtools_port(profile_dir):
+    """Lee el puerto de depuración que Chrome eligió al arrancar con --remote-debugging-port=0"""
+    try:
+        with open(Path(profile_dir) / DEVTOOLS_PORT_FILE, "r") as f:
+            return int(f.readline().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def is_profile_locked(profile_dir):
+    """Indica si otro proceso de Chrome tiene abierto el perfil"""
+    # SingletonLock es un symlink que puede apuntar a un destino inexistente
+    return any(os.path.lexists(Path(profile_dir) / name) for name in PROFILE_LOCK_FILES)
+
+
+def is_address_alive(address, timeout=0.5):
+    """Indica si hay un proceso escuchando en una dirección host:puerto"""
+    host, _, port = address.rpartition(":")
+    try:
+        with socket.create_connection((host, int(port)), timeout=timeout):
+            return True
+    except (OSError, ValueError):
+        return False
+
+
+def safe_profile_name(window_id):
+    """Convierte un window_id en un nombre de carpeta válido"""
+    return re.sub(r"[^\w.-]", "_", window_id)
+
+
+class SessionStore:
+    """Registra las sesiones de Chrome abiertas para reconectarse tras reiniciar la GUI"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error al leer las sesiones guardadas: {str(e)}")
+            return {}
+
+    def _save(self, sessions):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(sessions, f, indent=2)
+        except Exception as e:
+            logger.error(f"Error al guardar las sesiones: {str(e)}")
+
+    def get(self, window_id):
+        return self._load().get(window_id)
+
+    def save(self, window_id, debugger_address, profile_dir):
+        sessions = self._load()
+        sessions[window_id] = {
+            "debugger_address": debugger_address,
+            "profile_dir": str(profile_dir)
+        }
+        self._save(sessions)
+
+    def remove(self, window_id):
+        sessions = self._load()
+        if sessions.pop(window_id, None) is not None:
+            self._save(sessions)
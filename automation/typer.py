@@ -1,10 +1,14 @@
 import logging
 import os
 import platform
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
 
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -13,28 +17,112 @@ from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.keys import Keys
 
+from automation.governor import RateGovernor
+from automation.sessions import (
+    DEVTOOLS_PORT_FILE, SessionStore, is_address_alive, is_profile_locked,
+    read_devtools_port, safe_profile_name
+)
+from config import PIPELINE_SETTLE_TIMEOUT, PROFILES_DIR, SESSIONS_FILE, PipelineMode
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class WebTyper:
-    def __init__(self, check_interval=3):
+    def __init__(self, check_interval=3, profiles_dir=PROFILES_DIR):
         self.check_interval = check_interval
         self.drivers = {}
         self.initialized = False
+        self.profiles_dir = Path(profiles_dir)
+        self.sessions = SessionStore(self.profiles_dir / SESSIONS_FILE.name)
+        self._driver_path = None
+        self.governor = RateGovernor()
+        self.pipeline_mode = PipelineMode.NONE
+        self.window_locks = {}
+        self.locks_lock = threading.Lock()
+        self.prepared = {}
+        self.window_urls = {}
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pipeline")
         self.setup_logging()
 
     def setup_logging(self):
         """Configura el logging para la clase"""
         self.logger = logging.getLogger(__name__)
 
-    def initialize_driver(self, url, window_id):
-        """Inicializa un nuevo driver de Chrome para una ventana específica"""
+    def window_lock(self, window_id):
+        """Devuelve el lock de una ventana; los drivers de Selenium no son thread-safe"""
+        with self.locks_lock:
+            return self.window_locks.setdefault(window_id, threading.RLock())
+
+    @property
+    def pipelining(self):
+        return self.pipeline_mode != PipelineMode.NONE
+
+    def create_service(self):
+        """Crea el servicio de chromedriver, resolviendo su ruta una sola vez"""
+        if self._driver_path is None:
+            self._driver_path = ChromeDriverManager().install()
+
+        # Configurar el servicio con opciones específicas para macOS
+        if platform.system() == 'Darwin':
+            return Service(
+                self._driver_path,
+                log_path=os.devnull  # Redirigir logs a null para evitar problemas
+            )
+        return Service(self._driver_path)
+
+    def attach_session(self, window_id):
+        """Intenta reconectarse a un Chrome que siga abierto de una ejecución anterior"""
+        session = self.sessions.get(window_id)
+        if not session:
+            return None
+
+        address = session.get("debugger_address", "")
+        if not is_address_alive(address):
+            self.sessions.remove(window_id)
+            return None
+
+        try:
+            chrome_options = Options()
+            chrome_options.add_experimental_option("debuggerAddress", address)
+            driver = webdriver.Chrome(service=self.create_service(), options=chrome_options)
+            driver.set_page_load_timeout(30)
+            self.logger.info(f"Reconectado a la sesión existente de {window_id} en {address}")
+            return driver
+        except Exception as e:
+            self.logger.warning(f"No se pudo reconectar a la sesión de {window_id}: {str(e)}")
+            self.sessions.remove(window_id)
+            return None
+
+    def is_on_page(self, driver, url):
+        """Indica si el driver ya está en la página configurada (esquema, host y ruta)"""
+        try:
+            current, target = urlparse(driver.current_url), urlparse(url)
+            return (
+                current.scheme == target.scheme
+                and current.netloc == target.netloc
+                and current.path.rstrip("/") == target.path.rstrip("/")
+            )
+        except Exception:
+            return False
+
+    def initialize_driver(self, url, window_id, persistent_profile=False):
+        """Inicializa (o reconecta, con perfil persistente) el driver de Chrome de una ventana"""
         try:
+            self.window_urls[window_id] = url
             if window_id in self.drivers:
                 # Si el driver ya existe, solo navega a la URL
-                self.drivers[window_id].get(url)
+                with self.window_lock(window_id):
+                    self.drivers[window_id].get(url)
                 return True
 
+            if persistent_profile:
+                driver = self.attach_session(window_id)
+                if driver:
+                    if not self.is_on_page(driver, url):
+                        driver.get(url)
+                    self.drivers[window_id] = driver
+                    return True
+
             chrome_options = Options()
             chrome_options.add_argument("--start-maximized")
             
@@ -43,17 +131,38 @@ class WebTyper:
                 chrome_options.add_argument('--no-sandbox')
                 chrome_options.add_argument('--disable-dev-shm-usage')
                 chrome_options.add_argument('--disable-gpu')
-                
-                # Configurar el servicio con opciones específicas para macOS
-                service = Service(
-                    ChromeDriverManager().install(),
-                    log_path=os.devnull  # Redirigir logs a null para evitar problemas
-                )
-            else:
-                service = Service(ChromeDriverManager().install())
 
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            if persistent_profile:
+                profile_dir = self.profiles_dir / safe_profile_name(window_id)
+                profile_dir.mkdir(parents=True, exist_ok=True)
+                if is_profile_locked(profile_dir):
+                    self.logger.warning(
+                        f"El perfil {profile_dir} parece estar en uso por otro Chrome; "
+                        f"si el arranque falla, cierre esa ventana de Chrome y reintente"
+                    )
+                # Chrome elige el puerto y lo escribe en DevToolsActivePort
+                (profile_dir / DEVTOOLS_PORT_FILE).unlink(missing_ok=True)
+                chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+                chrome_options.add_argument("--remote-debugging-port=0")
+                # Mantener Chrome abierto aunque se cierre la aplicación
+                chrome_options.add_experimental_option("detach", True)
+
+            try:
+                driver = webdriver.Chrome(service=self.create_service(), options=chrome_options)
+            except Exception:
+                if persistent_profile and is_profile_locked(profile_dir):
+                    self.logger.error(
+                        f"No se pudo abrir Chrome para {window_id}: el perfil {profile_dir} "
+                        f"está bloqueado por otro Chrome que no responde. Ciérrelo y reintente"
+                    )
+                raise
             driver.set_page_load_timeout(30)  # Timeout de 30 segundos para cargar páginas
+            if persistent_profile:
+                port = read_devtools_port(profile_dir)
+                if port:
+                    self.sessions.save(window_id, f"127.0.0.1:{port}", profile_dir)
+                else:
+                    self.logger.warning(f"No se pudo leer el puerto de depuración de {profile_dir}")
             driver.get(url)
             
             self.drivers[window_id] = driver
@@ -80,27 +189,142 @@ class WebTyper:
             self.logger.error(f"Error al esperar el input: {str(e)}")
             return False
 
-    def type_text(self, window_id, input_id, text, delay=3):
-        """Tipea texto en un input específico y presiona Enter"""
+    def is_stale(self, element):
+        """Indica si un elemento ya no pertenece al DOM actual"""
         try:
-            element = self.wait_for_input(window_id, input_id)
-            if not element:
-                return False
+            element.is_enabled()
+            return False
+        except StaleElementReferenceException:
+            return True
+
+    def wait_for_settle(self, driver, submitted_element):
+        """Espera a que termine la navegación que pudo provocar el Enter"""
+        if submitted_element is not None and self.pipeline_mode != PipelineMode.REFOCUS:
+            # Si el Enter provoca una recarga, esperar a que el input viejo desaparezca
+            try:
+                WebDriverWait(driver, PIPELINE_SETTLE_TIMEOUT).until(
+                    EC.staleness_of(submitted_element)
+                )
+            except TimeoutException:
+                pass
+        WebDriverWait(driver, 30).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+
+    def prepare_window(self, window_id, input_ids, submitted_element=None):
+        """Deja listos los inputs de una ventana según pipeline_mode (en segundo plano)"""
+        start = time.monotonic()
+        with self.window_lock(window_id):
+            driver = self.drivers.get(window_id)
+            if not driver:
+                return None
+            try:
+                self.wait_for_settle(driver, submitted_element)
+                url = self.window_urls.get(window_id)
+                # Navegar a la URL en vez de refresh(): tras un POST pediría reenviar el formulario
+                if self.pipeline_mode == PipelineMode.RELOAD and url:
+                    driver.get(url)
+                elif self.pipeline_mode == PipelineMode.RELOAD:
+                    driver.refresh()
+                elif self.pipeline_mode == PipelineMode.BACK:
+                    driver.back()
 
-            element.clear()
-            time.sleep(delay)  # Espera antes de tipear
-            element.send_keys(text)
-            element.send_keys(Keys.RETURN)  # Presiona Enter
+                elements = {}
+                for input_id in input_ids:
+                    element = self.wait_for_input(window_id, input_id)
+                    if not element:
+                        self.governor.record(window_id, time.monotonic() - start, failed=True)
+                        return None
+                    elements[input_id] = element
+                driver.execute_script("arguments[0].focus();", elements[input_ids[0]])
+                self.governor.record(window_id, time.monotonic() - start)
+                return elements
+            except Exception as e:
+                self.governor.record(window_id, time.monotonic() - start, failed=True)
+                self.logger.error(f"Error al preparar la ventana {window_id}: {str(e)}")
+                return None
+
+    def mark_unprepared(self, window_id):
+        """Marca la ventana como no preparada para que el siguiente código recargue su URL"""
+        if self.pipelining:
+            failed = Future()
+            failed.set_result(None)
+            self.prepared[window_id] = failed
+
+    def take_prepared(self, window_id, input_id):
+        """Devuelve (input preparado o None, si la preparación de la ventana falló)"""
+        future = self.prepared.get(window_id)
+        if future is None:
+            return None, False
+        try:
+            elements = future.result()
+        except Exception:
+            elements = None
+        if elements is None:
+            self.prepared.pop(window_id, None)
+            return None, True
+        element = elements.pop(input_id, None)
+        if not elements:
+            self.prepared.pop(window_id, None)
+        if not element or self.is_stale(element):
+            # La página se re-renderizó tras el envío anterior: basta con volver a buscar el input
+            return None, False
+        return element, False
+
+    def type_text(self, window_id, input_id, text, delay=3, url=None, prepare_inputs=None):
+        """Tipea texto en un input específico (recargando url antes si se indica) y presiona Enter"""
+        self.governor.acquire(window_id)
+        start = time.monotonic()
+        try:
+            # Esperar fuera del lock: la preparación en curso lo necesita
+            element = None
+            if not url:
+                element, prepare_failed = self.take_prepared(window_id, input_id)
+                if prepare_failed:
+                    # Volver a la URL de la ventana en vez de esperar en una página rota
+                    url = self.window_urls.get(window_id)
+            with self.window_lock(window_id):
+                if url:
+                    self.drivers[window_id].get(url)
+                if not element:
+                    element = self.wait_for_input(window_id, input_id)
+                if not element:
+                    self.governor.record(window_id, time.monotonic() - start, failed=True)
+                    self.mark_unprepared(window_id)
+                    return False
+                ready_latency = time.monotonic() - start
+
+                element.clear()
+                time.sleep(delay)  # Espera antes de tipear
+                submit_start = time.monotonic()
+                element.send_keys(text)
+                element.send_keys(Keys.RETURN)  # Presiona Enter
+                self.governor.record(window_id, ready_latency + time.monotonic() - submit_start)
+
+            if self.pipelining and prepare_inputs:
+                self.prepared[window_id] = self.executor.submit(
+                    self.prepare_window, window_id, prepare_inputs, element
+                )
             return True
         except Exception as e:
+            self.governor.record(window_id, time.monotonic() - start, failed=True)
             self.logger.error(f"Error al tipear texto: {str(e)}")
+            self.mark_unprepared(window_id)
             return False
 
+    def shutdown(self):
+        """Cancela las preparaciones pendientes y libera el pool de hilos"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
     def close_all(self):
         """Cierra todos los drivers abiertos"""
-        for driver in self.drivers.values():
+        for future in self.prepared.values():
+            future.cancel()
+        self.prepared.clear()
+        for window_id, driver in self.drivers.items():
             try:
                 driver.quit()
+                self.sessions.remove(window_id)
             except Exception as e:
                 self.logger.error(f"Error al cerrar el driver: {str(e)}")
         self.drivers.clear()
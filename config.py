@@ -5,10 +5,28 @@ from datetime import datetime
 DEFAULT_CHECK_INTERVAL = 3  # segundos
 DEFAULT_TYPING_DELAY = 1    # segundos
 
+# Regulador de tasa por destino (códigos por segundo y latencia en segundos)
+GOVERNOR_MIN_RATE = 0.1
+GOVERNOR_MAX_RATE = 2.0
+GOVERNOR_INITIAL_RATE = 0.5
+GOVERNOR_INCREASE_STEP = 0.1
+GOVERNOR_TARGET_P95 = 5.0
+GOVERNOR_WINDOW = 20
+
+# Servidor de ingesta para varias estaciones de escaneo
+INGEST_HOST = "127.0.0.1"
+INGEST_PORT = 8765
+INGEST_MAX_PENDING = 200
+INGEST_MAX_BODY = 1024 * 1024  # bytes
+
 # Configuración de archivos
 BASE_DIR = Path(__file__).parent
 EXPORT_DIR = BASE_DIR / "exports"
 
+# Perfiles persistentes de Chrome (cookies, caché y service workers)
+PROFILES_DIR = Path.home() / ".web_typer_profiles"
+SESSIONS_FILE = PROFILES_DIR / "sessions.json"
+
 # Formato del nombre del archivo Excel
 def get_default_filename(num_codes: int) -> str:
     date_str = datetime.now().strftime("%d%m%Y")
@@ -25,4 +43,13 @@ class InputStatus:
     WAITING = "Esperando"
     READY = "Listo"
     TYPED = "Tipeado"
-    ERROR = "Error" 
\ No newline at end of file
+    ERROR = "Error"
+
+# Preparación del siguiente input tras cada envío (pipelining)
+class PipelineMode:
+    NONE = "Ninguno"
+    REFOCUS = "Reenfocar"
+    RELOAD = "Recargar"
+    BACK = "Volver"
+
+PIPELINE_SETTLE_TIMEOUT = 2  # segundos para detectar que la página se recarga tras Enter
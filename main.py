@@ -1,5 +1,6 @@
 import sys
 import logging
+import queue
 from pathlib import Path
 from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox
 from PySide6.QtCore import QObject, Signal, Slot, QThread
@@ -7,6 +8,7 @@ from PySide6.QtCore import QObject, Signal, Slot, QThread
 from ui.form import MainWindow
 from automation.typer import WebTyper
 from utils.excel_exporter import ExcelExporter
+from utils.ingest_server import IngestServer
 from config import DEFAULT_CHECK_INTERVAL, DEFAULT_TYPING_DELAY
 
 # Configuración de logging
@@ -25,39 +27,65 @@ class AutomationWorker(QObject):
     finished = Signal()
     error = Signal(str)
     status_changed = Signal(str, str)  # input_id, status
+    rate_changed = Signal(str, float, object)  # input_id, tasa, p95
 
-    def __init__(self, typer, configs, code):
+    def __init__(self, typer, configs, code, skip_inputs=()):
         super().__init__()
         self.typer = typer
         self.configs = configs
         self.code = code
+        self.skip_inputs = set(skip_inputs)  # inputs que ya recibieron el código en un intento anterior
 
     @Slot()
     def run(self):
         try:
             # Inicializar drivers para cada configuración
+            reload_urls = {}
             for config in self.configs:
                 window_id = f"window_{config['input_id']}"
-                if config['new_window']:
-                    if not self.typer.initialize_driver(config['url'], window_id):
+                if self.typer.pipelining and window_id in self.typer.drivers:
+                    # La ventana ya se preparó en segundo plano tras el envío anterior
+                    pass
+                elif config['new_window'] and window_id in self.typer.drivers:
+                    # La recarga se hace dentro de type_text para que el regulador la mida
+                    reload_urls[window_id] = config['url']
+                elif config['new_window']:
+                    if not self.typer.initialize_driver(config['url'], window_id, config.get('persistent_profile', False)):
                         self.error.emit(f"Error al abrir la ventana para {config['input_id']}")
                         return
                 else:
                     # Reutilizar la primera ventana si no es nueva
                     if not self.typer.drivers:
-                        if not self.typer.initialize_driver(config['url'], window_id):
+                        if not self.typer.initialize_driver(config['url'], window_id, config.get('persistent_profile', False)):
                             self.error.emit(f"Error al abrir la ventana para {config['input_id']}")
                             return
                     # No recargar la página aquí
                 self.status_changed.emit(config['input_id'], "Listo")
 
             # Tipear el código en cada input
+            targets = []
             for config in self.configs:
                 window_id = f"window_{config['input_id']}"
                 if not config['new_window']:
                     window_id = list(self.typer.drivers.keys())[0]
+                targets.append((config, window_id))
 
-                if self.typer.type_text(window_id, config['input_id'], self.code, DEFAULT_TYPING_DELAY):
+            # Con pipelining, cada ventana se prepara una sola vez, tras su último input
+            window_inputs = {}
+            for config, window_id in targets:
+                window_inputs.setdefault(window_id, []).append(config['input_id'])
+            last_index = {window_id: i for i, (_, window_id) in enumerate(targets)}
+
+            for i, (config, window_id) in enumerate(targets):
+                if config['input_id'] in self.skip_inputs:
+                    continue
+                typed = self.typer.type_text(
+                    window_id, config['input_id'], self.code, DEFAULT_TYPING_DELAY,
+                    url=reload_urls.get(window_id) if config['new_window'] else None,
+                    prepare_inputs=window_inputs[window_id] if last_index[window_id] == i else None
+                )
+                self.rate_changed.emit(config['input_id'], *self.typer.governor.snapshot(window_id))
+                if typed:
                     self.status_changed.emit(config['input_id'], "Tipeado")
                 else:
                     self.error.emit(f"Error al tipear en {config['input_id']}")
@@ -69,6 +97,10 @@ class AutomationWorker(QObject):
             logger.error(f"Error en el proceso de automatización: {str(e)}")
             self.error.emit(str(e))
 
+class IngestNotifier(QObject):
+    """Lleva los avisos del hilo del servidor de ingesta al hilo de la interfaz"""
+    codes_queued = Signal()
+
 class InputVerifierWorker(QObject):
     finished = Signal(bool)
     status_changed = Signal(str, str)  # input_id, status
@@ -87,7 +119,7 @@ class InputVerifierWorker(QObject):
             input_id = config['input_id']
             window_id = f"window_{input_id}"
             self.status_changed.emit(input_id, "Esperando")
-            ok = self.typer.initialize_driver(config['url'], window_id)
+            ok = self.typer.initialize_driver(config['url'], window_id, config.get('persistent_profile', False))
             if not ok:
                 self.status_changed.emit(input_id, "Error")
                 all_ok = False
@@ -111,11 +143,33 @@ class WebTyperApp:
         self.window = MainWindow()
         self.typer = WebTyper(DEFAULT_CHECK_INTERVAL)
         self.exporter = ExcelExporter()
+
+        # Cola única de códigos (input principal y estaciones remotas), procesada en orden
+        self.pending_codes = queue.Queue()
+        self.worker_running = False
+        self.current_item = None
+        self.current_typed = set()
+        self.retry_item = None
+        self.dispatch_paused = False
+        self.ingest_notifier = IngestNotifier()
+        self.ingest_server = IngestServer(self.pending_codes, on_queued=self.ingest_notifier.codes_queued.emit)
         
         # Conectar señales
         self.window.code_entered.connect(self.on_code_entered)
         self.window.start_btn.clicked.connect(self.start_process)
         self.window.export_btn.clicked.connect(self.export_excel)
+        self.window.min_rate.valueChanged.connect(self.update_rate_limits)
+        self.window.max_rate.valueChanged.connect(self.update_rate_limits)
+        self.window.pipeline_mode.currentTextChanged.connect(self.update_pipeline_mode)
+        self.ingest_notifier.codes_queued.connect(self.dispatch_next)
+        self.update_rate_limits()
+        self.update_pipeline_mode(self.window.pipeline_mode.currentText())
+
+    def update_pipeline_mode(self, mode):
+        self.typer.pipeline_mode = mode
+
+    def update_rate_limits(self):
+        self.typer.governor.set_limits(self.window.min_rate.value(), self.window.max_rate.value())
 
     def start_process(self):
         configs = self.window.get_input_configs()
@@ -146,36 +200,106 @@ class WebTyperApp:
         if all_ok:
             self.window.set_code_input_enabled(True)
             self.window.start_btn.setEnabled(False)
+            self.start_ingest_server()
+            self.resume_dispatch()
         else:
             self.window.set_code_input_enabled(False)
             self.window.start_btn.setEnabled(True)
             QMessageBox.critical(self.window, "Error", "Uno o más inputs no están listos. Corrija y reintente.")
 
+    def start_ingest_server(self):
+        if not self.window.ingest_enabled.isChecked():
+            return
+        host = self.window.ingest_host.text().strip()
+        port = self.window.ingest_port.value()
+        self.ingest_server.token = self.window.ingest_token.text()
+        if not self.ingest_server.start(host, port):
+            QMessageBox.warning(self.window, "Error", f"No se pudo iniciar el servidor de ingesta en {host}:{port}")
+            return
+        self.ingest_server.accepting = True
+
     def on_code_entered(self, code):
         if not self.window.code_input.isEnabled():
             return
 
+        self.pending_codes.put(("local", code))
+        self.dispatch_next()
+
+    def pending_count(self):
+        return self.pending_codes.qsize() + (1 if self.retry_item else 0)
+
+    def dispatch_next(self):
+        """Lanza el siguiente código de la cola si no hay otro en proceso"""
+        self.window.set_pending_count(self.pending_count())
+        if self.worker_running or self.dispatch_paused or not self.pending_count():
+            return
+
         configs = self.window.get_input_configs()
         if not configs:
             return
 
+        # El código que falló se reintenta antes que el resto de la cola,
+        # saltando los inputs que ya lo recibieron para no duplicar el escaneo
+        if self.retry_item:
+            producer, code, typed = self.retry_item
+            self.retry_item = None
+        else:
+            producer, code = self.pending_codes.get()
+            typed = set()
+        self.current_item = (producer, code)
+        self.current_typed = set(typed)
+        self.window.set_pending_count(self.pending_count())
+        logger.info(f"Procesando código {code} de {producer}")
+
         # Crear y configurar el worker
-        self.worker = AutomationWorker(self.typer, configs, code)
+        self.worker = AutomationWorker(self.typer, configs, code, self.current_typed)
         self.thread = QThread()
         self.worker.moveToThread(self.thread)
 
         # Conectar señales
         self.thread.started.connect(self.worker.run)
         self.worker.finished.connect(self.thread.quit)
+        self.worker.error.connect(self.thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
+        self.worker.error.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.error.connect(self.on_error)
+        self.thread.finished.connect(self.on_worker_done)
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.error.connect(self.on_worker_error)
         self.worker.status_changed.connect(self.on_status_changed)
+        self.worker.status_changed.connect(self.on_code_status_changed)
+        self.worker.rate_changed.connect(self.window.set_input_rate)
 
         # Iniciar el proceso
+        self.worker_running = True
         self.thread.start()
+
+    def on_worker_finished(self):
+        producer, code = self.current_item
         self.exporter.add_code(code)
 
+    def on_code_status_changed(self, input_id, status):
+        if status == "Tipeado":
+            self.current_typed.add(input_id)
+
+    def on_worker_error(self, error_msg):
+        # Pausar antes del diálogo: su event loop anidado seguiría despachando
+        self.dispatch_paused = True
+        self.ingest_server.accepting = False
+        self.retry_item = (*self.current_item, set(self.current_typed))
+        self.window.set_pending_count(self.pending_count())
+        self.on_error(error_msg)
+
+    def on_worker_done(self):
+        self.worker_running = False
+        self.current_item = None
+        self.dispatch_next()
+
+    def resume_dispatch(self):
+        """Reanuda la cola tras una verificación correcta"""
+        self.dispatch_paused = False
+        self.dispatch_next()
+
     def on_error(self, error_msg):
         QMessageBox.critical(self.window, "Error", error_msg)
         self.window.start_btn.setEnabled(True)
@@ -203,7 +327,10 @@ class WebTyperApp:
 
     def run(self):
         self.window.show()
-        return self.app.exec()
+        result = self.app.exec()
+        self.ingest_server.stop()
+        self.typer.shutdown()
+        return result
 
 if __name__ == "__main__":
     app = WebTyperApp()
@@ -0,0 +1,124 @@
+import pytest
+
+from automation import governor as governor_module
+from automation.governor import RateGovernor, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(governor_module.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(governor_module.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, window=10)
+    bucket.tokens = 0.0
+    clock.now += 0.25
+    bucket.refill(clock.now)
+    assert bucket.tokens == pytest.approx(0.5)
+    clock.now += 10
+    bucket.refill(clock.now)
+    assert bucket.tokens == pytest.approx(2.0)
+
+
+def test_bucket_capacity_is_at_least_one_token(clock):
+    bucket = TokenBucket(rate=0.1, window=10)
+    clock.now += 100
+    bucket.refill(clock.now)
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def test_bucket_p95():
+    bucket = TokenBucket(rate=1.0, window=20)
+    assert bucket.p95() is None
+    for latency in range(1, 21):
+        bucket.latencies.append(float(latency))
+    assert bucket.p95() == 19.0
+
+
+def test_acquire_waits_for_tokens(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=2.0, initial_rate=2.0)
+    start = clock.now
+    for _ in range(5):
+        governor.acquire("w")
+    # Un token inicial y cuatro más a 2 códigos/s
+    assert clock.now - start == pytest.approx(2.0)
+
+
+def test_rate_increases_while_latency_is_low(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=1.0, initial_rate=0.5,
+                            increase_step=0.1, target_p95=5.0)
+    for _ in range(RateGovernor.MIN_SAMPLES + 2):
+        governor.record("w", 0.5)
+    rate, p95 = governor.snapshot("w")
+    assert rate == pytest.approx(0.8)
+    assert p95 == 0.5
+
+
+def test_rate_is_capped_at_max(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=1.0, initial_rate=0.9, increase_step=0.5)
+    for _ in range(10):
+        governor.record("w", 0.1)
+    assert governor.snapshot("w")[0] == pytest.approx(1.0)
+
+
+def test_rate_halves_when_p95_exceeds_target(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=2.0, initial_rate=2.0, target_p95=5.0)
+    for _ in range(RateGovernor.MIN_SAMPLES):
+        governor.record("w", 10.0)
+    assert governor.snapshot("w")[0] == pytest.approx(1.0)
+
+
+def test_single_failure_backs_off_immediately_with_full_window(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=2.0, initial_rate=2.0, window=20)
+    for _ in range(20):
+        governor.record("w", 0.1)
+    governor.record("w", 30.0, failed=True)
+    rate, p95 = governor.snapshot("w")
+    assert rate == pytest.approx(1.0)
+    assert p95 == 30.0
+
+
+def test_rate_never_drops_below_min(clock):
+    governor = RateGovernor(min_rate=0.2, max_rate=2.0, initial_rate=0.3)
+    for _ in range(5):
+        governor.record("w", 30.0, failed=True)
+    assert governor.snapshot("w")[0] == pytest.approx(0.2)
+
+
+def test_set_limits_clamps_current_rates(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=2.0, initial_rate=2.0)
+    governor.acquire("w")
+    governor.set_limits(0.1, 0.5)
+    assert governor.snapshot("w")[0] == pytest.approx(0.5)
+    governor.set_limits(1.0, 0.5)
+    assert governor.max_rate == 1.0
+    assert governor.snapshot("w")[0] == pytest.approx(1.0)
+
+
+def test_targets_are_independent(clock):
+    governor = RateGovernor(min_rate=0.1, max_rate=2.0, initial_rate=2.0)
+    governor.record("a", 30.0, failed=True)
+    assert governor.snapshot("a")[0] == pytest.approx(1.0)
+    assert governor.snapshot("b")[0] == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("min_rate", [0, -1.0])
+def test_min_rate_must_be_positive(min_rate):
+    with pytest.raises(ValueError):
+        RateGovernor(min_rate=min_rate)
+    with pytest.raises(ValueError):
+        RateGovernor().set_limits(min_rate, 1.0)
@@ -0,0 +1,137 @@
+import http.client
+import json
+import queue
+
+import pytest
+
+from utils.ingest_server import TOKEN_HEADER, IngestServer, parse_payload
+
+
+@pytest.fixture
+def server():
+    ingest = IngestServer(queue.Queue(), max_pending=3)
+    ingest.accepting = True
+    return ingest
+
+
+@pytest.fixture
+def http_server(server):
+    assert server.start("127.0.0.1", 0)
+    yield server
+    server.stop()
+
+
+def post(server, body, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.httpd.server_address[1], timeout=5)
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    connection.request("POST", "/codes", body=data, headers=headers or {})
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def test_submit_accepts_batch_in_order(server):
+    notified = []
+    server.on_queued = lambda: notified.append(True)
+    status, body = server.submit("a", 1, ["x", "y"])
+    assert status == 202
+    assert body["accepted"] == 2
+    assert list(server.pending.queue) == [("a", "x"), ("a", "y")]
+    assert notified == [True]
+
+
+def test_submit_rejects_when_not_accepting(server):
+    server.accepting = False
+    status, body = server.submit("a", 1, ["x"])
+    assert status == 503
+    assert server.pending.empty()
+
+
+def test_submit_repeated_last_seq_is_duplicate(server):
+    server.submit("a", 1, ["x"])
+    status, body = server.submit("a", 1, ["x"])
+    assert status == 200
+    assert body["status"] == "duplicate"
+    assert server.pending.qsize() == 1
+
+
+@pytest.mark.parametrize("seq", [4, 1])
+def test_submit_rejects_gaps_and_older_seq(server, seq):
+    server.submit("a", 1, ["x"])
+    server.submit("a", 2, ["y"])
+    status, body = server.submit("a", seq, ["z"])
+    assert status == 409
+    assert body["expected"] == 3
+
+
+def test_submit_applies_backpressure_to_whole_batch(server):
+    server.submit("a", 1, ["x", "y"])
+    status, body = server.submit("a", 2, ["z", "w"])
+    assert status == 429
+    assert server.pending.qsize() == 2
+    # El mismo seq se acepta cuando hay espacio
+    server.pending.get()
+    assert server.submit("a", 2, ["z", "w"])[0] == 202
+
+
+def test_producers_have_independent_sequences(server):
+    assert server.submit("a", 1, ["x"])[0] == 202
+    assert server.submit("b", 1, ["y"])[0] == 202
+
+
+@pytest.mark.parametrize("payload", [
+    [1],
+    "A001",
+    {"codes": "A001"},
+    {"codes": [{"a": 1}]},
+    {"codes": [True]},
+    {"codes": []},
+    {"code": None},
+    {"codes": ["x"], "seq": True},
+    {"codes": ["x"], "seq": 1.9},
+    {"codes": ["x"], "seq": "1"},
+])
+def test_parse_payload_rejects_invalid(payload):
+    with pytest.raises(ValueError):
+        parse_payload(payload, "127.0.0.1")
+
+
+def test_parse_payload_accepts_single_code_and_ints():
+    assert parse_payload({"code": " A001 "}, "host") == ("host", None, ["A001"])
+    assert parse_payload({"producer": "p", "seq": 2, "codes": [7, "B", " "]}, "host") == ("p", 2, ["7", "B"])
+
+
+def test_post_queues_codes(http_server):
+    status, body = post(http_server, {"producer": "a", "seq": 1, "codes": ["x"]})
+    assert status == 202
+    assert list(http_server.pending.queue) == [("a", "x")]
+
+
+def test_post_rejects_invalid_payload(http_server):
+    status, body = post(http_server, {"codes": "A001"})
+    assert status == 400
+    assert http_server.pending.empty()
+
+
+def test_post_rejects_invalid_json(http_server):
+    assert post(http_server, b"{no json")[0] == 400
+
+
+@pytest.mark.parametrize("length", ["-1", str(10 * 1024 * 1024), "abc"])
+def test_post_rejects_bad_content_length(http_server, length):
+    connection = http.client.HTTPConnection("127.0.0.1", http_server.httpd.server_address[1], timeout=5)
+    connection.putrequest("POST", "/codes")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    connection.close()
+
+
+def test_post_requires_token_when_configured(http_server):
+    http_server.token = "secreto"
+    body = {"codes": ["x"]}
+    assert post(http_server, body)[0] == 401
+    assert post(http_server, body, {TOKEN_HEADER: "otro"})[0] == 401
+    assert post(http_server, body, {TOKEN_HEADER: "secreto"})[0] == 202
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLineEdit, QLabel, QSpinBox,
-    QCheckBox, QScrollArea, QFileDialog, QMessageBox,
+    QPushButton, QLineEdit, QLabel, QSpinBox, QDoubleSpinBox,
+    QCheckBox, QComboBox, QScrollArea, QFileDialog, QMessageBox,
     QProgressBar, QFrame, QSizePolicy
 )
 from PySide6.QtCore import Qt, Signal, QTimer
@@ -11,6 +11,8 @@ from pathlib import Path
 import platform
 import os
 
+from config import GOVERNOR_MAX_RATE, GOVERNOR_MIN_RATE, INGEST_HOST, INGEST_PORT, PipelineMode
+
 # Importar winsound solo en Windows
 if platform.system() == 'Windows':
     import winsound
@@ -41,12 +43,21 @@ class InputConfigWidget(QWidget):
         # Nueva ventana
         self.new_window = QCheckBox("Nueva ventana")
         layout.addWidget(self.new_window)
+
+        # Perfil persistente (cookies, caché y sesión se conservan entre arranques)
+        self.persistent_profile = QCheckBox("Perfil persistente")
+        layout.addWidget(self.persistent_profile)
         
         # Estado visual
         self.status_label = QLabel("Esperando")
         self.set_status("Esperando")
         self.status_label.setMinimumWidth(90)
         layout.addWidget(self.status_label)
+
+        # Tasa actual del regulador y p95 de latencia
+        self.rate_label = QLabel("— cód/s")
+        self.rate_label.setMinimumWidth(140)
+        layout.addWidget(self.rate_label)
         
         # Botón eliminar
         self.delete_btn = QPushButton("Eliminar")
@@ -70,7 +81,8 @@ class InputConfigWidget(QWidget):
         return {
             "input_id": self.input_id.text(),
             "url": self.url.text(),
-            "new_window": self.new_window.isChecked()
+            "new_window": self.new_window.isChecked(),
+            "persistent_profile": self.persistent_profile.isChecked()
         }
 
     def set_status(self, status):
@@ -84,6 +96,11 @@ class InputConfigWidget(QWidget):
         self.status_label.setText(status)
         self.status_label.setStyleSheet(f"background-color: {color}; color: white; border-radius: 5px; padding: 2px 8px;")
 
+    def set_rate(self, rate, p95):
+        """Muestra la tasa actual del regulador y el p95 de latencia"""
+        p95_text = f"{p95:.1f} s" if p95 is not None else "—"
+        self.rate_label.setText(f"{rate:.2f} cód/s · p95 {p95_text}")
+
 class MainWindow(QMainWindow):
     code_entered = Signal(str)
     
@@ -180,8 +197,67 @@ class MainWindow(QMainWindow):
         self.check_interval.setRange(1, 60)
         self.check_interval.setValue(3)
         time_layout.addWidget(self.check_interval)
+
+        # Límites del regulador de tasa
+        time_layout.addWidget(QLabel("Tasa mín (cód/s):"))
+        self.min_rate = QDoubleSpinBox()
+        self.min_rate.setRange(0.05, 20.0)
+        self.min_rate.setSingleStep(0.05)
+        self.min_rate.setValue(GOVERNOR_MIN_RATE)
+        time_layout.addWidget(self.min_rate)
+        time_layout.addWidget(QLabel("Tasa máx (cód/s):"))
+        self.max_rate = QDoubleSpinBox()
+        self.max_rate.setRange(0.05, 20.0)
+        self.max_rate.setSingleStep(0.1)
+        self.max_rate.setValue(GOVERNOR_MAX_RATE)
+        time_layout.addWidget(self.max_rate)
+        # La tasa máxima nunca puede quedar por debajo de la mínima
+        self.max_rate.setMinimum(self.min_rate.value())
+        self.min_rate.valueChanged.connect(self.max_rate.setMinimum)
         layout.addWidget(time_group)
 
+        # Preparación del siguiente input mientras se escanea
+        pipeline_group = QFrame()
+        pipeline_group.setFrameStyle(QFrame.StyledPanel)
+        pipeline_layout = QHBoxLayout(pipeline_group)
+        pipeline_layout.addWidget(QLabel("Preparar input tras cada envío:"))
+        self.pipeline_mode = QComboBox()
+        self.pipeline_mode.addItems([
+            PipelineMode.NONE,
+            PipelineMode.REFOCUS,
+            PipelineMode.RELOAD,
+            PipelineMode.BACK
+        ])
+        pipeline_layout.addWidget(self.pipeline_mode)
+        pipeline_layout.addStretch()
+        layout.addWidget(pipeline_group)
+
+        # Servidor de ingesta para otras estaciones de escaneo
+        ingest_group = QFrame()
+        ingest_group.setFrameStyle(QFrame.StyledPanel)
+        ingest_layout = QHBoxLayout(ingest_group)
+        self.ingest_enabled = QCheckBox("Servidor de ingesta")
+        ingest_layout.addWidget(self.ingest_enabled)
+        ingest_layout.addWidget(QLabel("Host:"))
+        self.ingest_host = QLineEdit(INGEST_HOST)
+        self.ingest_host.setMaximumWidth(140)
+        ingest_layout.addWidget(self.ingest_host)
+        ingest_layout.addWidget(QLabel("Puerto:"))
+        self.ingest_port = QSpinBox()
+        self.ingest_port.setRange(1024, 65535)
+        self.ingest_port.setValue(INGEST_PORT)
+        ingest_layout.addWidget(self.ingest_port)
+        ingest_layout.addWidget(QLabel("Token:"))
+        self.ingest_token = QLineEdit()
+        self.ingest_token.setPlaceholderText("Opcional")
+        self.ingest_token.setEchoMode(QLineEdit.Password)
+        self.ingest_token.setMaximumWidth(140)
+        ingest_layout.addWidget(self.ingest_token)
+        ingest_layout.addStretch()
+        self.pending_label = QLabel("En cola: 0")
+        ingest_layout.addWidget(self.pending_label)
+        layout.addWidget(ingest_group)
+
         # Barra de progreso
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -273,6 +349,16 @@ class MainWindow(QMainWindow):
             if widget.input_id.text() == input_id:
                 widget.set_status(status)
 
+    def set_input_rate(self, input_id, rate, p95):
+        """Actualiza la tasa mostrada de un input por su ID"""
+        for widget in self.get_input_widgets():
+            if widget.input_id.text() == input_id:
+                widget.set_rate(rate, p95)
+
+    def set_pending_count(self, count):
+        """Muestra cuántos códigos esperan en la cola"""
+        self.pending_label.setText(f"En cola: {count}")
+
     def set_all_inputs_status(self, status):
         for widget in self.get_input_widgets():
             widget.set_status(status)
@@ -294,6 +380,7 @@ class MainWindow(QMainWindow):
         if not configs:
             QMessageBox.warning(self, "Error", "Debe configurar al menos un input")
             return
+        self.save_config()
         self.start_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)  # Modo indeterminado
@@ -316,6 +403,13 @@ class MainWindow(QMainWindow):
     def save_config(self):
         config = {
             "check_interval": self.check_interval.value(),
+            "min_rate": self.min_rate.value(),
+            "max_rate": self.max_rate.value(),
+            "pipeline_mode": self.pipeline_mode.currentText(),
+            "ingest_enabled": self.ingest_enabled.isChecked(),
+            "ingest_host": self.ingest_host.text(),
+            "ingest_port": self.ingest_port.value(),
+            "ingest_token": self.ingest_token.text(),
             "inputs": self.get_input_configs()
         }
         config_path = Path.home() / ".web_typer_config.json"
@@ -329,11 +423,19 @@ class MainWindow(QMainWindow):
                 with open(config_path, "r") as f:
                     config = json.load(f)
                 self.check_interval.setValue(config.get("check_interval", 3))
+                self.min_rate.setValue(config.get("min_rate", GOVERNOR_MIN_RATE))
+                self.max_rate.setValue(config.get("max_rate", GOVERNOR_MAX_RATE))
+                self.pipeline_mode.setCurrentText(config.get("pipeline_mode", PipelineMode.NONE))
+                self.ingest_enabled.setChecked(config.get("ingest_enabled", False))
+                self.ingest_host.setText(config.get("ingest_host", INGEST_HOST))
+                self.ingest_port.setValue(config.get("ingest_port", INGEST_PORT))
+                self.ingest_token.setText(config.get("ingest_token", ""))
                 for input_config in config.get("inputs", []):
                     widget = InputConfigWidget()
                     widget.input_id.setText(input_config.get("input_id", ""))
                     widget.url.setText(input_config.get("url", ""))
                     widget.new_window.setChecked(input_config.get("new_window", False))
+                    widget.persistent_profile.setChecked(input_config.get("persistent_profile", False))
                     self.inputs_layout.addWidget(widget)
             except Exception as e:
                 print(f"Error al cargar la configuración: {e}") 
\ No newline at end of file
@@ -0,0 +1,178 @@
+import hmac
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import INGEST_HOST, INGEST_MAX_BODY, INGEST_MAX_PENDING, INGEST_PORT
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = "X-Ingest-Token"
+
+
+def parse_payload(payload, default_producer):
+    """Valida el cuerpo de POST /codes y devuelve (productor, seq, códigos)"""
+    if not isinstance(payload, dict):
+        raise ValueError("el cuerpo debe ser un objeto JSON")
+    producer = str(payload.get("producer") or default_producer)
+
+    seq = payload.get("seq")
+    if seq is not None and (isinstance(seq, bool) or not isinstance(seq, int)):
+        raise ValueError("seq debe ser un entero")
+
+    codes = payload.get("codes")
+    if codes is None:
+        codes = [payload.get("code")]
+    elif not isinstance(codes, list):
+        raise ValueError("codes debe ser una lista")
+    for code in codes:
+        if isinstance(code, bool) or not isinstance(code, (str, int)):
+            raise ValueError("cada código debe ser un texto o un entero")
+    codes = [str(code).strip() for code in codes if str(code).strip()]
+    if not codes:
+        raise ValueError("sin códigos")
+    return producer, seq, codes
+
+
+class IngestServer:
+    """Servidor HTTP local que recibe códigos de varias estaciones de escaneo.
+
+    Protocolo (JSON):
+        POST /codes  {"producer": "estacion-1", "seq": 7, "codes": ["A1", "A2"]}
+        GET  /status
+
+    Los códigos se encolan en la misma cola que el input principal y se
+    llama a on_queued tras cada lote aceptado.
+    """
+
+    def __init__(self, pending, max_pending=INGEST_MAX_PENDING, on_queued=None, token=""):
+        self.pending = pending
+        self.max_pending = max_pending
+        self.on_queued = on_queued
+        self.token = token
+        self.accepting = False
+        self.last_seq = {}
+        self.lock = threading.Lock()
+        self.httpd = None
+        self.thread = None
+
+    def start(self, host=INGEST_HOST, port=INGEST_PORT):
+        """Inicia el servidor en un hilo aparte"""
+        if self.httpd:
+            return True
+        try:
+            self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+            self.httpd.daemon_threads = True
+        except OSError as e:
+            logger.error(f"Error al iniciar el servidor de ingesta: {str(e)}")
+            self.httpd = None
+            return False
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        if not self.token and host not in ("127.0.0.1", "localhost", "::1"):
+            logger.warning("El servidor de ingesta escucha en la red sin token: cualquier equipo puede enviar códigos")
+        logger.info(f"Servidor de ingesta escuchando en {host}:{self.httpd.server_address[1]}")
+        return True
+
+    def stop(self):
+        """Detiene el servidor si está en marcha"""
+        if not self.httpd:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd = None
+        self.thread = None
+
+    def status(self):
+        return {
+            "accepting": self.accepting,
+            "pending": self.pending.qsize(),
+            "max_pending": self.max_pending
+        }
+
+    def is_authorized(self, token):
+        """Comprueba el token compartido, si hay uno configurado"""
+        if not self.token:
+            return True
+        return hmac.compare_digest((token or "").encode("utf-8"), self.token.encode("utf-8"))
+
+    def submit(self, producer, seq, codes):
+        """Encola un lote de códigos y devuelve (código HTTP, respuesta)"""
+        with self.lock:
+            if not self.accepting:
+                return 503, {"status": "not_ready", **self.status()}
+
+            last = self.last_seq.get(producer)
+            if seq is not None and last is not None:
+                if seq == last:
+                    return 200, {"status": "duplicate", "producer": producer, "seq": seq}
+                if seq != last + 1:
+                    return 409, {"status": "out_of_order", "producer": producer, "expected": last + 1}
+
+            if self.pending.qsize() + len(codes) > self.max_pending:
+                return 429, {"status": "busy", **self.status()}
+
+            for code in codes:
+                self.pending.put((producer, code))
+            if seq is not None:
+                self.last_seq[producer] = seq
+            # Notificar bajo el lock mantiene el orden de llegada por productor
+            if self.on_queued:
+                self.on_queued()
+            return 202, {
+                "status": "accepted",
+                "producer": producer,
+                "seq": seq,
+                "accepted": len(codes),
+                "pending": self.pending.qsize()
+            }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if code == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path != "/status":
+                    self._reply(404, {"status": "not_found"})
+                    return
+                self._reply(200, server.status())
+
+            def do_POST(self):
+                if self.path != "/codes":
+                    self._reply(404, {"status": "not_found"})
+                    return
+                if not server.is_authorized(self.headers.get(TOKEN_HEADER)):
+                    self.close_connection = True
+                    self._reply(401, {"status": "unauthorized"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > INGEST_MAX_BODY:
+                    self.close_connection = True
+                    self._reply(400, {"status": "bad_request", "detail": "Content-Length inválido"})
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    producer, seq, codes = parse_payload(payload, self.client_address[0])
+                except ValueError as e:
+                    self._reply(400, {"status": "bad_request", "detail": str(e)})
+                    return
+                self._reply(*server.submit(producer, seq, codes))
+
+            def log_message(self, format, *args):
+                logger.debug(f"Ingesta {self.client_address[0]}: {format % args}")
+
+        return Handler